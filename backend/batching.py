@@ -0,0 +1,208 @@
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Optional
+from database import SessionLocal
+from schemas import VendorCreate, VendorResponse
+import crud
+import dedupe
+import queue
+import threading
+import time
+import os
+
+# group commit: coalesce concurrent POST /vendors into one INSERT every few milliseconds
+# VENDOR_GROUP_COMMIT_MS = 0 keeps the default one-transaction-per-request path
+VENDOR_GROUP_COMMIT_MS = float(os.getenv("VENDOR_GROUP_COMMIT_MS", "0"))
+VENDOR_GROUP_COMMIT_MAX_BATCH = int(os.getenv("VENDOR_GROUP_COMMIT_MAX_BATCH", "500"))
+
+@dataclass
+class _PendingCreate:
+    org_id: int
+    vendor: VendorCreate
+    idempotency_key: Optional[str]
+    request_hash: Optional[str]
+    allow_duplicates: bool = False
+    future: Future = field(default_factory=Future)
+
+class VendorCreateBatcher:
+    """
+    Background writer that turns concurrent vendor creates into batched inserts
+
+    Callers block in submit() until their batch commits and get a snapshot of their
+    own vendor back (or the exception their row raised). The duplicate check runs here, not
+    on the request thread, so it sees rows committed while a create was queued
+    and the other creates in its own batch.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = VENDOR_GROUP_COMMIT_MS,
+        max_batch: int = VENDOR_GROUP_COMMIT_MAX_BATCH,
+        session_factory=SessionLocal
+    ):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.session_factory = session_factory
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="vendor-group-commit", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Flush whatever is queued and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(
+        self,
+        org_id: int,
+        vendor: VendorCreate,
+        idempotency_key: Optional[str] = None,
+        request_hash: Optional[str] = None,
+        allow_duplicates: bool = False,
+        timeout: Optional[float] = 30
+    ) -> VendorResponse:
+        pending = _PendingCreate(org_id, vendor, idempotency_key, request_hash, allow_duplicates)
+        self._queue.put(pending)
+        return pending.future.result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _split_duplicates(self, db, batch):
+        """
+        Fail creates that duplicate a committed vendor and split the rest into rows to
+        insert and (pending, earlier pending) pairs that duplicate an earlier row of the batch
+        """
+        checked = [pending for pending in batch if not pending.allow_duplicates]
+        # one query for the whole batch, the writer thread is the bottleneck
+        committed_matches = dict(zip(
+            map(id, checked),
+            crud.find_similar_vendors_bulk(db, [(p.org_id, p.vendor.name) for p in checked])
+        ))
+
+        accepted = []
+        collisions = []
+        seen = {}  # (org_id, band, bucket) -> earlier accepted create
+        for pending in batch:
+            key = dedupe.normalize_name(pending.vendor.name)
+            blocks = [(pending.org_id, band, bucket) for band, bucket in dedupe.band_buckets(key)]
+            if not pending.allow_duplicates:
+                matches = committed_matches[id(pending)]
+                if matches:
+                    pending.future.set_exception(
+                        crud.DuplicateVendorError(pending.vendor.name, [_snapshot(m) for m in matches])
+                    )
+                    continue
+                earlier = next((
+                    seen[block] for block in blocks
+                    if block in seen and dedupe.similarity(
+                        key, dedupe.normalize_name(seen[block].vendor.name)
+                    ) >= dedupe.DEDUPE_THRESHOLD
+                ), None)
+                # a retry racing its own original is settled by the idempotency key instead
+                if earlier is not None and (
+                    pending.idempotency_key is None or pending.idempotency_key != earlier.idempotency_key
+                ):
+                    collisions.append((pending, earlier))
+                    continue
+            accepted.append(pending)
+            for block in blocks:
+                seen.setdefault(block, pending)
+        return accepted, collisions
+
+    def _flush(self, batch):
+        db = self.session_factory()
+        try:
+            accepted, collisions = self._split_duplicates(db, batch)
+            self._insert(db, accepted)
+            for pending, earlier in collisions:
+                if earlier.future.exception() is None:
+                    pending.future.set_exception(
+                        crud.DuplicateVendorError(pending.vendor.name, [earlier.future.result()])
+                    )
+                else:
+                    # the row it collided with was never created, so it gets a normal create
+                    self._insert_one(pending, allow_duplicates=False)
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+        finally:
+            db.close()
+
+    def _insert(self, db, batch):
+        if not batch:
+            return
+        try:
+            vendors = crud.create_vendors_bulk(
+                db,
+                [(p.org_id, p.vendor, p.idempotency_key, p.request_hash) for p in batch]
+            )
+        except Exception:
+            db.rollback()
+            # one bad row (or two retries racing on a key) must not fail the whole batch,
+            # so replay it row by row and hand each caller its own outcome
+            for pending in batch:
+                self._insert_one(pending, allow_duplicates=True)  # checked in _split_duplicates
+            return
+        for pending, vendor in zip(batch, vendors):
+            pending.future.set_result(_snapshot(vendor))
+
+    def _insert_one(self, pending, allow_duplicates: bool):
+        # a session per row, so a failed row never rolls back objects another caller holds
+        db = self.session_factory()
+        try:
+            vendor = crud.create_vendor(
+                db,
+                org_id=pending.org_id,
+                vendor=pending.vendor,
+                idempotency_key=pending.idempotency_key,
+                request_hash=pending.request_hash,
+                allow_duplicates=allow_duplicates or pending.allow_duplicates
+            )
+            pending.future.set_result(_snapshot(vendor))
+        except crud.DuplicateVendorError as e:
+            pending.future.set_exception(
+                crud.DuplicateVendorError(pending.vendor.name, [_snapshot(m) for m in e.matches])
+            )
+        except Exception as e:
+            pending.future.set_exception(e)
+        finally:
+            db.close()
+
+def _snapshot(vendor) -> VendorResponse:
+    """
+    Detached copy of a vendor for the request thread
+
+    The writer's session outlives the hand-off, so the caller must never touch its
+    ORM instances, which a later rollback would expire.
+    """
+    return VendorResponse.model_validate(vendor)
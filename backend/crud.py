@@ -1,25 +1,112 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, desc, asc
-from models import Vendor, VendorStatus, PaymentMethod
-from schemas import VendorCreate, VendorUpdate
-from typing import Optional, List
+from sqlalchemy import or_, and_, desc, asc, func, update, delete, insert, select, tuple_, union, values, column
+from sqlalchemy import Integer, SmallInteger, BigInteger, String
+from models import Vendor, VendorStatus, PaymentMethod, IdempotencyKey, VendorNameBucket, vendors_archive
+from schemas import VendorCreate, VendorUpdate, VendorResponse
+from typing import Optional, List, Tuple
+import dedupe
+from datetime import datetime
+
+def _live(org_id: int) -> list:
+    """Filters for an org's vendors that are not soft-deleted (matches the partial indexes)"""
+    return [Vendor.org_id == org_id, Vendor.deleted_at.is_(None)]
 
 # Create
-def create_vendor(db: Session, vendor: VendorCreate) -> Vendor:
-    """Create a new vendor in the database"""
-    db_vendor = Vendor(**vendor.model_dump())
+def _idempotency_record(org_id: int, key: str, request_hash: str, db_vendor: Vendor) -> IdempotencyKey:
+    return IdempotencyKey(
+        org_id=org_id,
+        key=key,
+        request_hash=request_hash,
+        status_code=201,
+        response_body=VendorResponse.model_validate(db_vendor).model_dump(mode="json")
+    )
+
+class DuplicateVendorError(Exception):
+    """Raised when a new vendor looks like one the org already has"""
+
+    def __init__(self, name: str, matches: List[Vendor]):
+        self.matches = matches
+        super().__init__(f"Vendor '{name}' looks like a duplicate of: {', '.join(m.name for m in matches)}")
+
+def create_vendor(
+    db: Session,
+    org_id: int,
+    vendor: VendorCreate,
+    idempotency_key: Optional[str] = None,
+    request_hash: Optional[str] = None,
+    allow_duplicates: bool = False
+) -> Vendor:
+    """
+    Create a new vendor in the database for the given org
+
+    With an idempotency key, the response is stored in the same transaction, so a
+    concurrent retry with the same key fails with IntegrityError instead of duplicating.
+
+    Raises:
+        DuplicateVendorError: A similar vendor exists and allow_duplicates is False
+    """
+    if not allow_duplicates:
+        matches = find_similar_vendors(db, org_id, vendor.name)
+        if matches:
+            raise DuplicateVendorError(vendor.name, matches)
+
+    db_vendor = Vendor(org_id=org_id, name_key=dedupe.normalize_name(vendor.name), **vendor.model_dump())
     db.add(db_vendor)
-    db.commit()
+    db.flush()
     db.refresh(db_vendor)  # get the ID and timestamps
+    db.add_all(dedupe.name_buckets(db_vendor))
+    if idempotency_key is not None:
+        db.add(_idempotency_record(org_id, idempotency_key, request_hash, db_vendor))
+    db.commit()
     return db_vendor
 
+def create_vendors_bulk(
+    db: Session,
+    items: List[Tuple[int, VendorCreate, Optional[str], Optional[str]]]
+) -> List[Vendor]:
+    """
+    Create many vendors with one multi-row INSERT ... RETURNING and one commit
+
+    Args:
+        items: (org_id, vendor, idempotency_key, request_hash) per vendor
+    Returns:
+        The created vendors, in the same order as items
+
+    Duplicate checks are the caller's job (see find_similar_vendors).
+    """
+    rows = [
+        {"org_id": org_id, "name_key": dedupe.normalize_name(vendor.name), **vendor.model_dump()}
+        for org_id, vendor, _, _ in items
+    ]
+    # PostgreSQL runs this as a single INSERT; SQLite can't order RETURNING rows so it
+    # falls back to one INSERT per row, still inside the single transaction
+    db_vendors = db.scalars(
+        insert(Vendor).returning(Vendor, sort_by_parameter_order=True),
+        rows
+    ).all()
+
+    for db_vendor in db_vendors:
+        db.add_all(dedupe.name_buckets(db_vendor))
+    db.add_all([
+        _idempotency_record(org_id, key, request_hash, db_vendor)
+        for (org_id, _, key, request_hash), db_vendor in zip(items, db_vendors)
+        if key is not None
+    ])
+    db.commit()
+    return db_vendors
+
+def get_idempotency_record(db: Session, org_id: int, key: str) -> Optional[IdempotencyKey]:
+    """Get the stored response for an Idempotency-Key, if the key was used before"""
+    return db.query(IdempotencyKey).filter(IdempotencyKey.org_id == org_id, IdempotencyKey.key == key).first()
+
 # Read
-def get_vendor(db: Session, vendor_id: int) -> Optional[Vendor]:
+def get_vendor(db: Session, org_id: int, vendor_id: int) -> Optional[Vendor]:
     """Get a single vendor by ID"""
-    return db.query(Vendor).filter(Vendor.id == vendor_id).first()
+    return db.query(Vendor).filter(*_live(org_id), Vendor.id == vendor_id).first()
 
 def get_vendors(
     db: Session,
+    org_id: int,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -31,13 +118,14 @@ def get_vendors(
     
     Args:
         db: Database session
+        org_id: Tenant whose vendors are returned
         skip: Number of records to skip (pagination)
         limit: Maximum number of records to return
         search: Search term to filter by name, category, or owner
         sort_by: Column name to sort by
         sort_order: 'asc' or 'desc'
     """
-    query = db.query(Vendor)
+    query = db.query(Vendor).filter(*_live(org_id))
     
     # Apply search filter
     if search:
@@ -65,9 +153,9 @@ def get_vendors(
     
     return query.offset(skip).limit(limit).all()
 
-def get_vendors_count(db: Session, search: Optional[str] = None) -> int:
+def get_vendors_count(db: Session, org_id: int, search: Optional[str] = None) -> int:
     """Get total count of vendors (for pagination)"""
-    query = db.query(Vendor)
+    query = db.query(Vendor).filter(*_live(org_id))
     
     if search:
         search_filter = f"%{search}%"
@@ -81,31 +169,351 @@ def get_vendors_count(db: Session, search: Optional[str] = None) -> int:
     
     return query.count()
 
+# Duplicate detection
+def _best_matches(key: str, candidates: List[Vendor], limit: int) -> List[Vendor]:
+    """Candidates at or above the duplicate threshold, best match first"""
+    scored = [(dedupe.similarity(key, c.name_key), c) for c in candidates]
+    scored = [(score, c) for score, c in scored if score >= dedupe.DEDUPE_THRESHOLD]
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    return [c for _, c in scored[:limit]]
+
+def find_similar_vendors(db: Session, org_id: int, name: str, limit: int = 5) -> List[Vendor]:
+    """
+    Vendors in the org whose name is a likely duplicate of `name`, best match first
+
+    Only vendors sharing the normalized key or an LSH bucket are compared, so the
+    cost depends on the number of candidates, not the size of the table.
+    """
+    key = dedupe.normalize_name(name)
+    bucket_matches = select(VendorNameBucket.vendor_id).where(
+        VendorNameBucket.org_id == org_id,
+        tuple_(VendorNameBucket.band, VendorNameBucket.bucket).in_(dedupe.band_buckets(key))
+    )
+    # exact key matches first, so the candidate cap never cuts them off
+    candidates = db.query(Vendor).filter(*_live(org_id), Vendor.name_key == key).limit(100).all()
+    if len(candidates) < 100:
+        candidates += (
+            db.query(Vendor)
+            .filter(*_live(org_id), Vendor.name_key != key, Vendor.id.in_(bucket_matches))
+            .limit(100 - len(candidates))
+            .all()
+        )
+
+    return _best_matches(key, candidates, limit)
+
+def find_similar_vendors_bulk(
+    db: Session,
+    items: List[Tuple[int, str]],
+    limit: int = 5
+) -> List[List[Vendor]]:
+    """
+    find_similar_vendors for many (org_id, name) at once, with a single query
+
+    Returns the matches for each item, in the same order as items.
+    """
+    if not items:
+        return []
+    keys = [(org_id, dedupe.normalize_name(name)) for org_id, name in items]
+    buckets = {key: set(dedupe.band_buckets(key)) for _, key in keys}
+    blocks = {(org_id, *block) for org_id, key in keys for block in buckets[key]}
+
+    # the batch's keys and buckets as VALUES tables joined to the indexes, one probe per row
+    key_rows = values(
+        column("org_id", Integer), column("name_key", String), name="batch_keys"
+    ).data(sorted(set(keys))).cte()
+    block_rows = values(
+        column("org_id", Integer), column("band", SmallInteger), column("bucket", BigInteger), name="batch_blocks"
+    ).data(sorted(blocks)).cte()
+    key_matches = select(Vendor.org_id, Vendor.id).join(
+        key_rows, and_(Vendor.org_id == key_rows.c.org_id, Vendor.name_key == key_rows.c.name_key)
+    ).where(Vendor.deleted_at.is_(None))
+    bucket_matches = select(VendorNameBucket.org_id, VendorNameBucket.vendor_id).join(
+        block_rows, and_(
+            VendorNameBucket.org_id == block_rows.c.org_id,
+            VendorNameBucket.band == block_rows.c.band,
+            VendorNameBucket.bucket == block_rows.c.bucket
+        )
+    )
+    matched = union(key_matches, bucket_matches).subquery()
+    candidates = db.query(Vendor).join(
+        matched, and_(Vendor.org_id == matched.c.org_id, Vendor.id == matched.c.id)
+    ).filter(Vendor.deleted_at.is_(None)).all()
+
+    by_org = {}
+    for candidate in candidates:
+        by_org.setdefault(candidate.org_id, []).append(candidate)
+        if candidate.name_key not in buckets:
+            buckets[candidate.name_key] = set(dedupe.band_buckets(candidate.name_key))
+    # each name is only compared with the vendors its own key or buckets found, like find_similar_vendors
+    return [
+        _best_matches(key, [
+            candidate for candidate in by_org.get(org_id, [])
+            if candidate.name_key == key or buckets[key] & buckets[candidate.name_key]
+        ], limit)
+        for org_id, key in keys
+    ]
+
+# anchor pairs read per get_duplicate_groups call, bounds the page before its groups are completed
+DUPLICATE_PAIRS_PER_PAGE = 5000
+
+def get_duplicate_groups(
+    db: Session,
+    org_id: int,
+    limit: int = 100,
+    after_id: int = 0,
+    max_pairs: int = DUPLICATE_PAIRS_PER_PAGE
+) -> Tuple[List[List[Vendor]], Optional[int]]:
+    """
+    One page of groups of likely duplicate vendors in the org
+
+    Candidate pairs come from a self-join on shared LSH buckets, are verified with the
+    shingle similarity and then merged into groups (union-find). A page starts from at
+    most max_pairs pairs of the vendors after `after_id`, then follows every member's
+    bucket partners until its groups are complete. Each group is reported once, on
+    the page holding its smallest id, so paging returns the same groups as one big page.
+
+    Returns:
+        (groups, next_after_id), next_after_id is None on the last page
+    """
+    a = VendorNameBucket.__table__.alias("a")
+    b = VendorNameBucket.__table__.alias("b")
+    shared_bucket = (a.c.org_id == b.c.org_id) & (a.c.band == b.c.band) & (a.c.bucket == b.c.bucket)
+    pairs = db.execute(
+        select(a.c.vendor_id, b.c.vendor_id)
+        .join(b, shared_bucket)
+        .where(a.c.org_id == org_id, a.c.vendor_id > after_id, a.c.vendor_id < b.c.vendor_id)
+        .distinct()
+        .order_by(a.c.vendor_id, b.c.vendor_id)
+        .limit(max_pairs + 1)
+    ).all()
+
+    next_after_id = None
+    if len(pairs) > max_pairs:
+        pairs = pairs[:max_pairs]
+        last = pairs[-1][0]
+        complete = [pair for pair in pairs if pair[0] != last]
+        # leave the last vendor's pairs for the next page, unless it alone fills a page
+        pairs = complete or pairs
+        next_after_id = pairs[-1][0]
+    if not pairs:
+        return [], None
+
+    vendors = {}
+    loaded = set()
+    parent = {}
+    def find(vendor_id):
+        parent.setdefault(vendor_id, vendor_id)
+        while parent[vendor_id] != vendor_id:
+            parent[vendor_id] = parent[parent[vendor_id]]
+            vendor_id = parent[vendor_id]
+        return vendor_id
+
+    expanded = set()
+    while pairs:
+        missing = {vendor_id for pair in pairs for vendor_id in pair} - loaded
+        if missing:
+            vendors.update(
+                (v.id, v) for v in db.query(Vendor).filter(*_live(org_id), Vendor.id.in_(missing)).all()
+            )
+            loaded |= missing
+
+        frontier = set()
+        for left, right in pairs:
+            if left in vendors and right in vendors and dedupe.similarity(
+                vendors[left].name_key, vendors[right].name_key
+            ) >= dedupe.DEDUPE_THRESHOLD:
+                parent[find(left)] = find(right)
+                frontier |= {left, right}
+
+        # a group can run past this page's pairs, through later ids or back before
+        # after_id, so follow the new members' partners in both directions
+        frontier -= expanded
+        expanded |= frontier
+        pairs = db.execute(
+            select(a.c.vendor_id, b.c.vendor_id)
+            .join(b, shared_bucket)
+            .where(a.c.org_id == org_id, a.c.vendor_id.in_(frontier), a.c.vendor_id != b.c.vendor_id)
+            .distinct()
+        ).all() if frontier else []
+
+    groups = {}
+    for vendor_id in parent:
+        groups.setdefault(find(vendor_id), []).append(vendors[vendor_id])
+    result = [sorted(group, key=lambda v: v.id) for group in groups.values() if len(group) > 1]
+    # groups reaching back to after_id or before were reported on an earlier page
+    result = [group for group in result if group[0].id > after_id]
+    result.sort(key=lambda group: group[0].id)
+    if len(result) > limit:
+        # the next page rebuilds the first dropped group from its smallest id
+        next_after_id = result[limit][0].id - 1
+        result = result[:limit]
+    return result, next_after_id
+
 # Update
-def update_vendor(db: Session, vendor_id: int, vendor_update: VendorUpdate) -> Optional[Vendor]:
-    """Update an existing vendor"""
-    db_vendor = db.query(Vendor).filter(Vendor.id == vendor_id).first()
-    
-    if db_vendor is None:
-        return None
-    
+class VersionConflictError(Exception):
+    """Raised when a conditional write's expected version no longer matches the row"""
+
+def _vendor_exists(db: Session, org_id: int, vendor_id: int) -> bool:
+    return db.query(Vendor.id).filter(*_live(org_id), Vendor.id == vendor_id).first() is not None
+
+def update_vendor(
+    db: Session,
+    org_id: int,
+    vendor_id: int,
+    vendor_update: VendorUpdate,
+    expected_version: Optional[int] = None
+) -> Optional[Vendor]:
+    """
+    Update an existing vendor in a single UPDATE ... RETURNING statement
+
+    Args:
+        expected_version: If given, only update when the row is still at this version
+    Raises:
+        VersionConflictError: The vendor exists but its version has moved on
+    """
     # Update only provided fields
     update_data = vendor_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_vendor, field, value)
-    
+    if update_data.get("name") is not None:
+        update_data["name_key"] = dedupe.normalize_name(update_data["name"])
+
+    conditions = [*_live(org_id), Vendor.id == vendor_id]
+    if expected_version is not None:
+        conditions.append(Vendor.version == expected_version)
+
+    stmt = (
+        update(Vendor)
+        .where(*conditions)
+        .values(**update_data, version=Vendor.version + 1)
+        .returning(Vendor)
+        .execution_options(synchronize_session=False)
+    )
+    db_vendor = db.execute(stmt).scalar_one_or_none()
+    if db_vendor is not None and "name_key" in update_data:
+        # renamed, so its LSH buckets move too
+        db.execute(
+            delete(VendorNameBucket)
+            .where(VendorNameBucket.org_id == org_id, VendorNameBucket.vendor_id == vendor_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.add_all(dedupe.name_buckets(db_vendor))
     db.commit()
-    db.refresh(db_vendor)
+
+    # only the failure path pays for a second query, to tell 404 from 412
+    if db_vendor is None and expected_version is not None and _vendor_exists(db, org_id, vendor_id):
+        raise VersionConflictError(f"Vendor {vendor_id} is no longer at version {expected_version}")
     return db_vendor
 
 # Delete
-def delete_vendor(db: Session, vendor_id: int) -> bool:
-    """Delete a vendor"""
-    db_vendor = db.query(Vendor).filter(Vendor.id == vendor_id).first()
-    
-    if db_vendor is None:
-        return False
-    
-    db.delete(db_vendor)
+def delete_vendor(db: Session, org_id: int, vendor_id: int, expected_version: Optional[int] = None) -> bool:
+    """
+    Soft-delete a vendor in a single UPDATE ... RETURNING statement
+
+    The row stays as a tombstone until purge_deleted_vendors archives it.
+
+    Raises:
+        VersionConflictError: expected_version was given and no longer matches
+    """
+    conditions = [*_live(org_id), Vendor.id == vendor_id]
+    if expected_version is not None:
+        conditions.append(Vendor.version == expected_version)
+
+    deleted_id = db.execute(
+        update(Vendor)
+        .where(*conditions)
+        .values(deleted_at=func.now(), version=Vendor.version + 1)
+        .returning(Vendor.id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    db.commit()
+
+    if deleted_id is None and expected_version is not None and _vendor_exists(db, org_id, vendor_id):
+        raise VersionConflictError(f"Vendor {vendor_id} is no longer at version {expected_version}")
+    return deleted_id is not None
+
+def restore_vendor(db: Session, org_id: int, vendor_id: int) -> Optional[Vendor]:
+    """Undo a soft delete, returns None if there is no tombstone to restore"""
+    db_vendor = db.execute(
+        update(Vendor)
+        .where(Vendor.org_id == org_id, Vendor.id == vendor_id, Vendor.deleted_at.is_not(None))
+        .values(deleted_at=None, version=Vendor.version + 1)
+        .returning(Vendor)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
     db.commit()
-    return True
\ No newline at end of file
+    return db_vendor
+
+def purge_deleted_vendors(db: Session, older_than: datetime, batch_size: int = 500) -> int:
+    """
+    Move tombstones deleted before `older_than` into vendors_archive
+
+    Works in batches of `batch_size`, committing after each, so no transaction
+    holds locks on more than one batch of rows. Returns the number archived.
+    """
+    vendor_columns = [column.name for column in Vendor.__table__.columns]
+    purged = 0
+
+    while True:
+        rows = db.execute(
+            select(Vendor.id, Vendor.org_id)
+            .where(Vendor.deleted_at.is_not(None), Vendor.deleted_at < older_than)
+            .order_by(Vendor.deleted_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+
+        db.execute(
+            insert(vendors_archive).from_select(
+                vendor_columns,
+                select(*[Vendor.__table__.c[name] for name in vendor_columns]).where(Vendor.id.in_(ids))
+            )
+        )
+        db.execute(
+            delete(VendorNameBucket)
+            .where(tuple_(VendorNameBucket.org_id, VendorNameBucket.vendor_id).in_(
+                [(row.org_id, row.id) for row in rows]
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            delete(Vendor)
+            .where(Vendor.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        purged += len(ids)
+
+        if len(ids) < batch_size:
+            break
+
+    return purged
+
+def purge_idempotency_keys(db: Session, older_than: datetime) -> int:
+    """Forget Idempotency-Keys created before `older_than`, returns the number removed"""
+    removed = db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.created_at < older_than)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return removed
+
+# Stats
+def get_vendor_stats(db: Session, org_id: int) -> dict:
+    """Get summary statistics for one org's vendors"""
+    query = db.query(Vendor).filter(*_live(org_id))
+
+    total_vendors = query.count()
+    active_vendors = query.filter(Vendor.status == VendorStatus.ACTIVE).count()
+    total_spend = (
+        db.query(func.sum(Vendor.total_spend)).filter(*_live(org_id)).scalar() or 0
+    )
+
+    return {
+        "total_vendors": total_vendors,
+        "active_vendors": active_vendors,
+        "inactive_vendors": total_vendors - active_vendors,
+        "total_spend": round(total_spend, 2)
+    }
\ No newline at end of file
@@ -1,22 +1,144 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url, Select
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from fastapi import Request, Response
+import itertools
+import math
+import threading
+import time
 import os
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# tenant used when a request does not carry an X-Org-Id header
+DEFAULT_ORG_ID = int(os.getenv("DEFAULT_ORG_ID", "1"))
+
+# optional comma separated read replicas, e.g. "postgresql://replica1/db,postgresql://replica2/db"
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+# after a write, a client's reads stay on the primary for this many seconds (counted from the write request)
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+class PoolWaitTracker:
+    """Moving average of how long checkouts wait for a pooled connection"""
+
+    def __init__(self, half_life: float = 5.0, weight: float = 0.2):
+        self.half_life = half_life
+        self.weight = weight
+        self._value = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now: float) -> float:
+        # fades while nothing checks out, so a shed burst doesn't keep the average high forever
+        return self._value * 0.5 ** ((now - self._updated) / self.half_life)
+
+    def record(self, seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            self._value = self._decayed(now) * (1 - self.weight) + seconds * self.weight
+            self._updated = now
+
+    def current(self) -> float:
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+# read by the load shedder in ratelimit.py
+pool_wait = PoolWaitTracker()
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports every checkout's wait to pool_wait"""
+
+    def connect(self):
+        start = time.monotonic()
+        try:
+            return super().connect()
+        finally:
+            pool_wait.record(time.monotonic() - start)
+
+def _create_engine(url: str):
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # in-memory SQLite needs its single-connection pool
+        return create_engine(url)
+    return create_engine(url, poolclass=TimedQueuePool)
+
+engine = _create_engine(DATABASE_URL)
+replica_engines = [_create_engine(url) for url in DATABASE_REPLICA_URLS]
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs to its assigned replica (if any)
+
+    Flushes and any non-SELECT statement always go to the primary engine.
+    """
+    replica = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.replica is not None and not self._flushing and isinstance(clause, Select):
+            return self.replica
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+# objects returned by UPDATE ... RETURNING stay loaded after commit instead of being re-SELECTed
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 
 Base = declarative_base()
 
-# Dependency for FastAPI routes
-def get_db():
+# replica selection and read-your-writes stickiness
+_replica_cycle = itertools.cycle(replica_engines)
+_replica_lock = threading.Lock()
+
+# the client carries its last write time (cookie for browsers, header for API clients),
+# so whichever worker or pod serves the next read can honour it
+LAST_WRITE_COOKIE = "last_write_at"
+LAST_WRITE_HEADER = "X-Last-Write-At"
+
+def mark_write(response: Response):
+    """Stamp the response with the write time, pinning the client's reads to the primary"""
+    written_at = f"{time.time():.3f}"
+    response.set_cookie(
+        LAST_WRITE_COOKIE, written_at, max_age=math.ceil(REPLICA_STICKY_SECONDS), httponly=True, samesite="lax"
+    )
+    response.headers[LAST_WRITE_HEADER] = written_at
+
+def wrote_recently(request: Request) -> bool:
+    """Whether the client wrote within the sticky window"""
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    try:
+        age = time.time() - float(value)
+    except (TypeError, ValueError):
+        return False
+    # a timestamp far in the future is forged, not clock skew between pods
+    return -REPLICA_STICKY_SECONDS < age < REPLICA_STICKY_SECONDS
+
+def pick_replica(request: Request):
+    """Round-robin replica for a read, or None if the primary should serve it"""
+    if not replica_engines or wrote_recently(request):
+        return None
+    with _replica_lock:
+        return next(_replica_cycle)
+
+# Dependency for FastAPI routes that write (always the primary)
+def get_db(response: Response):
+    db = SessionLocal()
+    mark_write(response)
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency for read-only FastAPI routes (load-balanced across replicas)
+def get_read_db(request: Request):
     db = SessionLocal()
+    db.replica = pick_replica(request)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,110 @@
+from sqlalchemy import delete, tuple_
+from sqlalchemy.orm import Session
+from models import Vendor, VendorNameBucket
+from typing import List, Set, Tuple
+import hashlib
+import random
+import re
+import os
+import zlib
+
+# MinHash / LSH parameters: BANDS * ROWS_PER_BAND hash functions. Two names land in a
+# shared bucket with high probability once their similarity passes ~(1/BANDS)^(1/ROWS_PER_BAND)
+BANDS = 8
+ROWS_PER_BAND = 4
+# candidates from the buckets must reach this shingle Jaccard similarity to count as duplicates
+DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.6"))
+
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "llp", "lp", "ltd", "limited", "corp", "corporation",
+    "co", "company", "plc", "gmbh", "ag", "sa", "bv", "pty", "pllc", "pc",
+}
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1099)  # fixed seed, stored buckets must stay comparable across restarts
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS_PER_BAND)
+]
+
+def normalize_name(name: str) -> str:
+    """
+    Reduce a vendor name to its comparison key
+
+    "Workgrounds, INC.", "workgrounds" and "Work Grounds Inc" all become "workgrounds".
+    Spaces are dropped too, names are split into words inconsistently.
+    """
+    tokens = re.sub(r"[^\w\s]", " ", name.lower().replace("&", " and ")).split()
+    core = list(tokens)
+    while core and core[-1] in LEGAL_SUFFIXES:
+        core.pop()
+    # a name that is nothing but a suffix ("Co") keeps its tokens
+    return "".join(core or tokens)
+
+def shingles(key: str, size: int = 3) -> Set[str]:
+    """Character shingles of a normalized key"""
+    if len(key) <= size:
+        return {key}
+    return {key[i:i + size] for i in range(len(key) - size + 1)}
+
+def similarity(key_a: str, key_b: str) -> float:
+    """Jaccard similarity of two keys' shingle sets"""
+    a, b = shingles(key_a), shingles(key_b)
+    return len(a & b) / len(a | b)
+
+def minhash(key: str) -> List[int]:
+    hashes = [zlib.crc32(shingle.encode()) for shingle in shingles(key)]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def band_buckets(key: str) -> List[Tuple[int, int]]:
+    """(band, bucket) pairs for a key, the blocking keys stored in vendor_name_buckets"""
+    signature = minhash(key)
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "big", signed=True)))
+    return buckets
+
+def name_buckets(vendor: Vendor) -> List[VendorNameBucket]:
+    """Bucket rows for a flushed vendor whose name_key is set"""
+    return [
+        VendorNameBucket(org_id=vendor.org_id, band=band, bucket=bucket, vendor_id=vendor.id)
+        for band, bucket in band_buckets(vendor.name_key)
+    ]
+
+def rebuild_name_index(db: Session, batch_size: int = 1000) -> int:
+    """Recompute name_key and LSH buckets for every vendor, returns the number indexed"""
+    indexed = 0
+    last_id = 0
+    while True:
+        vendors = (
+            db.query(Vendor).filter(Vendor.id > last_id).order_by(Vendor.id).limit(batch_size).all()
+        )
+        if not vendors:
+            break
+
+        db.execute(
+            delete(VendorNameBucket)
+            .where(tuple_(VendorNameBucket.org_id, VendorNameBucket.vendor_id).in_(
+                [(vendor.org_id, vendor.id) for vendor in vendors]
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        for vendor in vendors:
+            vendor.name_key = normalize_name(vendor.name)
+            db.add_all(name_buckets(vendor))
+        db.commit()
+
+        indexed += len(vendors)
+        last_id = vendors[-1].id
+
+    return indexed
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"Indexed {rebuild_name_index(db)} vendor names for duplicate detection")
+    finally:
+        db.close()
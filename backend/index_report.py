@@ -0,0 +1,203 @@
+from sqlalchemy import create_engine, event, func, inspect, text
+from sqlalchemy.orm import Session
+from database import Base, DATABASE_URL, DEFAULT_ORG_ID
+from datetime import datetime, timezone
+from models import Vendor
+from schemas import VendorCreate, VendorUpdate
+import crud
+import re
+import sys
+
+# the columns the vendor table lets users sort by
+SORTABLE_COLUMNS = [
+    "name", "total_spend", "thirty_day_spend", "ninety_day_spend", "department", "creation_date", "status"
+]
+
+engine = create_engine(DATABASE_URL)
+
+if engine.dialect.name == "sqlite":
+    # pysqlite's own transaction handling breaks SAVEPOINTs, which the rolled-back
+    # workload depends on, so let SQLAlchemy emit BEGIN itself
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_sqlite_transaction(conn):
+        conn.exec_driver_sql("BEGIN")
+
+def _sample_values(db: Session):
+    """An org, vendor id and name from the data so the plans reflect real rows"""
+    org_id = (
+        db.query(Vendor.org_id).group_by(Vendor.org_id).order_by(func.count().desc()).limit(1).scalar()
+        or DEFAULT_ORG_ID
+    )
+    vendor = db.query(Vendor).filter(Vendor.org_id == org_id).first()
+    return org_id, (vendor.id if vendor else 1), (vendor.name if vendor else "Acme")
+
+def _workload(db: Session, org_id: int, vendor_id: int, name: str):
+    """Every crud.py function, called the way the API and the purge job call it"""
+    return [
+        (
+            "create_vendor",
+            lambda: crud.create_vendor(
+                db, org_id, VendorCreate(name=name), "index-report", "index-report", allow_duplicates=True
+            )
+        ),
+        ("create_vendors_bulk", lambda: crud.create_vendors_bulk(db, [(org_id, VendorCreate(name=name), None, None)])),
+        ("get_vendor", lambda: crud.get_vendor(db, org_id, vendor_id)),
+        ("get_vendors", lambda: crud.get_vendors(db, org_id)),
+        *[
+            (f"get_vendors sort_by={column}", lambda column=column: crud.get_vendors(db, org_id, sort_by=column))
+            for column in SORTABLE_COLUMNS
+        ],
+        ("get_vendors search", lambda: crud.get_vendors(db, org_id, search=name[:3])),
+        ("get_vendors_count", lambda: crud.get_vendors_count(db, org_id)),
+        ("get_vendor_stats", lambda: crud.get_vendor_stats(db, org_id)),
+        ("find_similar_vendors", lambda: crud.find_similar_vendors(db, org_id, name)),
+        ("find_similar_vendors_bulk", lambda: crud.find_similar_vendors_bulk(db, [(org_id, name), (org_id, "Acme")])),
+        ("get_duplicate_groups", lambda: crud.get_duplicate_groups(db, org_id)),
+        ("get_idempotency_record", lambda: crud.get_idempotency_record(db, org_id, "index-report")),
+        ("update_vendor", lambda: crud.update_vendor(db, org_id, vendor_id, VendorUpdate(owner="index-report"))),
+        ("delete_vendor", lambda: crud.delete_vendor(db, org_id, vendor_id)),
+        ("restore_vendor", lambda: crud.restore_vendor(db, org_id, vendor_id)),
+        ("purge_deleted_vendors", lambda: crud.purge_deleted_vendors(db, datetime(1970, 1, 1, tzinfo=timezone.utc))),
+        ("purge_idempotency_keys", lambda: crud.purge_idempotency_keys(db, datetime(1970, 1, 1, tzinfo=timezone.utc))),
+    ]
+
+def _capture_statements(conn):
+    """Run the workload in a transaction that is rolled back, returning (label, sql, params)"""
+    captured = []
+    current = {"label": None}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current["label"] and statement.lstrip().split()[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            captured.append((current["label"], statement, parameters))
+
+    # commits inside crud release savepoints instead of committing
+    db = Session(bind=conn, join_transaction_mode="create_savepoint")
+    org_id, vendor_id, name = _sample_values(db)
+
+    event.listen(conn, "before_cursor_execute", before_cursor_execute)
+    try:
+        for label, call in _workload(db, org_id, vendor_id, name):
+            current["label"] = label
+            call()
+    finally:
+        current["label"] = None
+        event.remove(conn, "before_cursor_execute", before_cursor_execute)
+        db.close()
+    return captured
+
+def _partition_index_parents(conn) -> dict:
+    """Partition index name -> parent index name (PostgreSQL partitioning)"""
+    if conn.dialect.name != "postgresql":
+        return {}
+    return dict(conn.execute(text(
+        "SELECT c.relname, p.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE c.relkind = 'i'"
+    )).all())
+
+def _explain(conn, statement, parameters):
+    """Plan lines, the indexes they use and the problems they show"""
+    if conn.dialect.name == "postgresql":
+        lines = [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+        used = re.findall(r"Index (?:Only )?Scan(?: Backward)? using (\w+)|Bitmap Index Scan on (\w+)", "\n".join(lines))
+        used = {a or b for a, b in used}
+        problems = [
+            f"full scan of {m}" for m in re.findall(r"Seq Scan on (\w+)", "\n".join(lines))
+        ] + ["sorts rows without an index" for line in lines if line.strip().lstrip("-> ").startswith("Sort ")]
+    else:
+        lines = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        used = set(re.findall(r"USING (?:COVERING )?INDEX (\w+)", "\n".join(lines)))
+        problems = [
+            f"full scan of {m.group(1)}" for line in lines
+            if (m := re.match(r"SCAN (\w+)$", line.strip()))
+        ] + ["sorts rows without an index" for line in lines if "TEMP B-TREE FOR ORDER BY" in line]
+    return lines, used, problems
+
+def _index_usage_stats(conn, parents: dict) -> dict:
+    """Index name -> scans since the stats were last reset (PostgreSQL only)"""
+    if conn.dialect.name != "postgresql":
+        return {}
+    scans = {}
+    for name, count in conn.execute(text(
+        "SELECT s.indexrelname, s.idx_scan FROM pg_stat_user_indexes s "
+        "JOIN pg_index i ON i.indexrelid = s.indexrelid "
+        "WHERE NOT i.indisunique AND NOT i.indisprimary"
+    )).all():
+        name = parents.get(name, name)
+        scans[name] = scans.get(name, 0) + count
+    return scans
+
+def index_report() -> bool:
+    """Print the report, returns True when every crud query has a usable index"""
+    inspector = inspect(engine)
+    ok = True
+
+    print("Indexes declared in models.py but missing from the database:")
+    missing_declared = [
+        (table.name, index.name)
+        for table in Base.metadata.sorted_tables if inspector.has_table(table.name)
+        for index in table.indexes
+        if index.name not in {i["name"] for i in inspector.get_indexes(table.name)}
+    ]
+    for table_name, index_name in missing_declared:
+        print(f"  {table_name}.{index_name}  (run `alembic upgrade head`)")
+    if not missing_declared:
+        print("  none")
+    ok = ok and not missing_declared
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            if conn.dialect.name == "postgresql":
+                # with seq scans priced out, a Seq Scan in the plan means no index can serve it
+                conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            parents = _partition_index_parents(conn)
+            captured = _capture_statements(conn)
+
+            print("\nQueries crud.py issues without a usable index:")
+            used_indexes = set()
+            reported = set()
+            for label, statement, parameters in captured:
+                _, used, problems = _explain(conn, statement, parameters)
+                used_indexes |= {parents.get(name, name) for name in used}
+                for problem in problems:
+                    if (label, problem) not in reported:
+                        reported.add((label, problem))
+                        print(f"  {label}: {problem}")
+            if not reported:
+                print("  none")
+            ok = ok and not reported
+
+            scans = _index_usage_stats(conn, parents)
+        finally:
+            transaction.rollback()
+
+    print("\nIndexes no crud.py query uses:")
+    unused = [
+        (table.name, index.name)
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+        if index.name not in used_indexes
+    ]
+    for table_name, index_name in unused:
+        live_scans = f", {scans[index_name]} scans in production stats" if index_name in scans else ""
+        print(f"  {table_name}.{index_name}{live_scans}")
+    if not unused:
+        print("  none")
+
+    if scans:
+        print("\nIndexes never scanned since the statistics were reset:")
+        never = sorted(name for name, count in scans.items() if count == 0)
+        for name in never:
+            print(f"  {name}")
+        if not never:
+            print("  none")
+
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if index_report() else 1)
@@ -1,11 +1,128 @@
+from sqlalchemy import Index, MetaData, Table, inspect, text
+from alembic import command
+from alembic.runtime.migration import MigrationContext
+from alembic.config import Config
 from database import engine, Base
 from models import Vendor
+import os
+
+# optional PostgreSQL declarative partitioning of the vendors table on org_id
+# VENDOR_PARTITION_STRATEGY: "hash" or "list" (unset = plain table)
+VENDOR_PARTITION_STRATEGY = os.getenv("VENDOR_PARTITION_STRATEGY", "").lower()
+VENDOR_PARTITION_COUNT = int(os.getenv("VENDOR_PARTITION_COUNT", "8"))
+
+def _partitioned_vendors_table(strategy: str) -> Table:
+    """
+    Build a copy of the vendors table partitioned by org_id
+
+    PostgreSQL requires the partition key in every unique constraint, so the
+    primary key becomes (org_id, id) on the partitioned table.
+    """
+    source = Vendor.__table__
+    columns = []
+    for column in source.columns:
+        copy = column._copy()
+        if column.name == "org_id":
+            copy.primary_key = True
+        elif column.name == "id":
+            copy.autoincrement = True
+        columns.append(copy)
+
+    table = Table(
+        source.name,
+        MetaData(),
+        *columns,
+        postgresql_partition_by=f"{strategy.upper()} (org_id)"
+    )
+    for index in source.indexes:
+        Index(index.name, *[table.c[column.name] for column in index.columns], **index.dialect_kwargs)
+    return table
+
+def create_org_partition(org_id: int):
+    """
+    Give a single org its own list partition (list strategy only)
+
+    PostgreSQL won't create a partition while the default partition holds rows
+    for its values, so the default is detached, the org's rows are moved into the
+    new partition and the default is attached again, all in one transaction.
+    Writes to vendors wait on the lock until it commits.
+    """
+    org_id = int(org_id)
+    partition = f"vendors_org_{org_id}"
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE vendors IN ACCESS EXCLUSIVE MODE"))
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": partition}).scalar() is not None:
+            return
+
+        conn.execute(text("ALTER TABLE vendors DETACH PARTITION vendors_default"))
+        conn.execute(text(f"CREATE TABLE {partition} PARTITION OF vendors FOR VALUES IN ({org_id})"))
+        conn.execute(text(f"INSERT INTO vendors SELECT * FROM vendors_default WHERE org_id = {org_id}"))
+        conn.execute(text(f"DELETE FROM vendors_default WHERE org_id = {org_id}"))
+        conn.execute(text("ALTER TABLE vendors ATTACH PARTITION vendors_default DEFAULT"))
+
+def create_partitioned_vendors(strategy: str, partitions: int = VENDOR_PARTITION_COUNT):
+    """Create the vendors table with hash or list partitioning on org_id"""
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("Vendor partitioning requires PostgreSQL")
+    if strategy not in ("hash", "list"):
+        raise ValueError(f"Unknown partition strategy: {strategy}")
+
+    table = _partitioned_vendors_table(strategy)
+    with engine.begin() as conn:
+        if conn.dialect.has_table(conn, table.name):
+            print("Vendors table already exists, skipping partition setup")
+            return
+        table.create(bind=conn)
+
+        if strategy == "hash":
+            for remainder in range(partitions):
+                conn.execute(text(
+                    f"CREATE TABLE vendors_p{remainder} PARTITION OF vendors "
+                    f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+                ))
+        else:
+            # orgs without their own partition land here until one is created
+            conn.execute(text("CREATE TABLE vendors_default PARTITION OF vendors DEFAULT"))
+    print(f"Created vendors table partitioned by {strategy} on org_id")
+
+def _alembic_config() -> Config:
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    alembic_config = Config(os.path.join(backend_dir, "alembic.ini"))
+    alembic_config.set_main_option("script_location", os.path.join(backend_dir, "migrations"))
+    return alembic_config
 
 def init_db():
-    """Create all database tables"""
+    """
+    Create all database tables on a new database, or migrate an existing one
+
+    Only a database without a vendors table is created from models.py and stamped
+    at head. One that alembic already tracks is upgraded to head. One created by
+    the original init_db.py has no revision to start from, so it is left alone.
+    """
+    with engine.connect() as conn:
+        vendors_exist = inspect(conn).has_table("vendors")
+        revision = MigrationContext.configure(conn).get_current_revision()
+
+    if vendors_exist:
+        if revision is None:
+            raise SystemExit(
+                "The vendors table exists but the database isn't tracked by alembic. "
+                "If it was created by the original init_db.py, run "
+                "`alembic stamp 0001 && alembic upgrade head` instead."
+            )
+        print(f"Database exists at revision {revision}, upgrading...")
+        command.upgrade(_alembic_config(), "head")
+        print("Database upgraded successfully!")
+        return
+
     print("Creating database tables...")
+    if VENDOR_PARTITION_STRATEGY:
+        create_partitioned_vendors(VENDOR_PARTITION_STRATEGY)
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully!")
 
+    # tables created from models.py already match the latest migration
+    command.stamp(_alembic_config(), "head")
+
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
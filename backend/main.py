@@ -1,11 +1,18 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Header, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import hashlib
 
-from database import get_db
+from database import get_db, get_read_db, mark_write, pool_wait, DEFAULT_ORG_ID
 from schemas import VendorCreate, VendorUpdate, VendorResponse
 import crud
+from batching import VendorCreateBatcher, VENDOR_GROUP_COMMIT_MS
+from compression import CompressionMiddleware
+from ratelimit import RateLimitMiddleware, backend_from_env
 
 app = FastAPI(
     title="Vendor Management API",
@@ -13,6 +20,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# per-client rate limits and load shedding, "/" and "/health" always pass
+# (added before CORS so it runs inside it and 429/503 responses keep their CORS headers)
+app.add_middleware(RateLimitMiddleware, backend=backend_from_env(), pool_wait=pool_wait.current)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -25,9 +36,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip (or brotli/zstd when installed) per Accept-Encoding, above COMPRESSION_MINIMUM_SIZE bytes
+app.add_middleware(CompressionMiddleware)
+
+# optional group commit for POST /vendors
+vendor_batcher = VendorCreateBatcher() if VENDOR_GROUP_COMMIT_MS > 0 else None
+
+@app.on_event("startup")
+def start_vendor_batcher():
+    if vendor_batcher is not None:
+        vendor_batcher.start()
+
+@app.on_event("shutdown")
+def stop_vendor_batcher():
+    if vendor_batcher is not None:
+        vendor_batcher.stop()
+
+# tenant scoping
+def get_org_id(
+    x_org_id: Optional[int] = Header(None, ge=1, description="Tenant (org) the request acts on")
+) -> int:
+    """Resolve the org for the request, falling back to the default org"""
+    return x_org_id if x_org_id is not None else DEFAULT_ORG_ID
+
+# optimistic concurrency
+def etag_for(vendor) -> str:
+    return f'"{vendor.version}"'
+
+def parse_if_match(
+    if_match: Optional[str] = Header(None, description="ETag (version) the write is conditional on")
+) -> Optional[int]:
+    """Turn an If-Match header into the expected vendor version (None = unconditional)"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid If-Match header: {if_match}")
+
 # health check
+# async so they never wait for a threadpool slot behind busy vendor requests
 @app.get("/")
-def read_root():
+async def read_root():
     return {
         "message": "Vendor Management API",
         "version": "1.0.0",
@@ -35,7 +88,7 @@ def read_root():
     }
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "healthy"}
 
 # vendor management endpoints
@@ -47,7 +100,9 @@ def list_vendors(
     search: Optional[str] = Query(None, description="Search by name, category, or owner"),
     sort_by: Optional[str] = Query(None, description="Column to sort by"),
     sort_order: str = Query("asc", regex="^(asc|desc)$", description="Sort order"),
-    db: Session = Depends(get_db)
+    response_format: str = Query("rows", alias="format", regex="^(rows|columns)$", description="Response layout"),
+    org_id: int = Depends(get_org_id),
+    db: Session = Depends(get_read_db)
 ):
     """
     Get list of all vendors with optional search and sorting
@@ -58,9 +113,12 @@ def list_vendors(
     - search: Search term (searches name, category, owner)
     - sort_by: Column name to sort by
     - sort_order: 'asc' or 'desc'
+    - format: 'rows' (list of vendor objects) or 'columns' (one array per field,
+      so repeated keys are sent once)
     """
     vendors = crud.get_vendors(
         db=db,
+        org_id=org_id,
         skip=skip,
         limit=limit,
         search=search,
@@ -68,7 +126,15 @@ def list_vendors(
         sort_order=sort_order
     )
     
-    total_count = crud.get_vendors_count(db=db, search=search)
+    total_count = crud.get_vendors_count(db=db, org_id=org_id, search=search)
+    
+    if response_format == "columns":
+        return {
+            "columns": {field: [getattr(v, field) for v in vendors] for field in VendorResponse.model_fields},
+            "total": total_count,
+            "skip": skip,
+            "limit": limit
+        }
     
     return {
         "vendors": vendors,
@@ -77,18 +143,68 @@ def list_vendors(
         "limit": limit
     }
 
+@app.get("/vendors/duplicates")
+def list_duplicate_vendors(
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of groups"),
+    after_id: int = Query(0, ge=0, description="next_after_id from the previous page"),
+    org_id: int = Depends(get_org_id),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Report groups of vendors that are likely duplicates of each other, one page at a time
+
+    Names are compared after normalization (case, punctuation, legal suffixes
+    such as INC/LLC), using the MinHash/LSH buckets maintained in dedupe.py.
+    Pass next_after_id back as after_id for the next page (null on the last one).
+    """
+    groups, next_after_id = crud.get_duplicate_groups(db=db, org_id=org_id, limit=limit, after_id=after_id)
+    
+    return {
+        "groups": [[VendorResponse.model_validate(v) for v in group] for group in groups],
+        "total": len(groups),
+        "next_after_id": next_after_id
+    }
+
 @app.get("/vendors/{vendor_id}", response_model=VendorResponse)
-def get_vendor(vendor_id: int, db: Session = Depends(get_db)):
+def get_vendor(
+    vendor_id: int,
+    response: Response,
+    org_id: int = Depends(get_org_id),
+    db: Session = Depends(get_read_db)
+):
     """Get a specific vendor by ID"""
-    vendor = crud.get_vendor(db=db, vendor_id=vendor_id)
+    vendor = crud.get_vendor(db=db, org_id=org_id, vendor_id=vendor_id)
     
     if vendor is None:
         raise HTTPException(status_code=404, detail=f"Vendor with id {vendor_id} not found")
     
+    response.headers["ETag"] = etag_for(vendor)
     return vendor
 
+def replay_idempotent_response(record, request_hash: str) -> JSONResponse:
+    """Return the stored response for a retried request"""
+    if record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+    response = JSONResponse(
+        status_code=record.status_code,
+        content=record.response_body,
+        headers={"Idempotent-Replayed": "true"}
+    )
+    # the first response (and its write marker) may never have reached the client
+    mark_write(response)
+    return response
+
 @app.post("/vendors", response_model=VendorResponse, status_code=201)
-def create_vendor(vendor: VendorCreate, db: Session = Depends(get_db)):
+def create_vendor(
+    vendor: VendorCreate,
+    allow_duplicates: bool = Query(False, description="Create even if a similar vendor exists"),
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Makes retries of this create safe"),
+    org_id: int = Depends(get_org_id),
+    db: Session = Depends(get_db)
+):
     """
     Create a new vendor
     
@@ -100,51 +216,132 @@ def create_vendor(vendor: VendorCreate, db: Session = Depends(get_db)):
     - location: Location (optional)
     - department: Department (optional)
     - status: Vendor status (optional, defaults to 'active')
+
+    Returns 409 with the matching vendors when the name looks like an existing
+    vendor's, unless allow_duplicates=true.
+
+    Headers:
+    - Idempotency-Key: retries with the same key return the first response instead of a duplicate
     """
+    request_hash = hashlib.sha256(vendor.model_dump_json().encode()).hexdigest()
+    if idempotency_key is not None:
+        record = crud.get_idempotency_record(db=db, org_id=org_id, key=idempotency_key)
+        if record is not None:
+            return replay_idempotent_response(record, request_hash)
+
     try:
-        new_vendor = crud.create_vendor(db=db, vendor=vendor)
+        if vendor_batcher is not None:
+            # hand the pooled connection back while this request waits on the writer thread,
+            # which also runs the duplicate check against the table and the rest of the batch
+            db.close()
+            try:
+                return vendor_batcher.submit(org_id, vendor, idempotency_key, request_hash, allow_duplicates)
+            except FutureTimeoutError:
+                # the row is still queued and may yet commit, a retry with the same
+                # Idempotency-Key gets its stored response instead of a second vendor
+                raise HTTPException(
+                    status_code=503,
+                    detail="Vendor creation is queued but not yet committed, retry with the same Idempotency-Key",
+                    headers={"Retry-After": "1"}
+                )
+        new_vendor = crud.create_vendor(
+            db=db,
+            org_id=org_id,
+            vendor=vendor,
+            idempotency_key=idempotency_key,
+            request_hash=request_hash,
+            allow_duplicates=allow_duplicates
+        )
         return new_vendor
+    except crud.DuplicateVendorError as e:
+        # the "duplicate" may be this request's own original, committed while it was queued
+        record = crud.get_idempotency_record(db=db, org_id=org_id, key=idempotency_key) if idempotency_key else None
+        if record is not None:
+            return replay_idempotent_response(record, request_hash)
+        raise HTTPException(status_code=409, detail={
+            "message": str(e),
+            "matches": [{"id": m.id, "name": m.name} for m in e.matches]
+        })
+    except IntegrityError as e:
+        # a concurrent retry with the same key won the race, answer with its response
+        db.rollback()
+        record = crud.get_idempotency_record(db=db, org_id=org_id, key=idempotency_key) if idempotency_key else None
+        if record is not None:
+            return replay_idempotent_response(record, request_hash)
+        raise HTTPException(status_code=400, detail=f"Error creating vendor: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error creating vendor: {str(e)}")
 
 @app.put("/vendors/{vendor_id}", response_model=VendorResponse)
-def update_vendor(vendor_id: int, vendor_update: VendorUpdate, db: Session = Depends(get_db)):
+def update_vendor(
+    vendor_id: int,
+    vendor_update: VendorUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(parse_if_match),
+    org_id: int = Depends(get_org_id),
+    db: Session = Depends(get_db)
+):
     """
     Update an existing vendor
     
     Only provided fields will be updated. Omitted fields remain unchanged.
+    Send the vendor's ETag in If-Match to fail with 412 instead of overwriting a concurrent edit.
     """
-    updated_vendor = crud.update_vendor(db=db, vendor_id=vendor_id, vendor_update=vendor_update)
+    try:
+        updated_vendor = crud.update_vendor(
+            db=db,
+            org_id=org_id,
+            vendor_id=vendor_id,
+            vendor_update=vendor_update,
+            expected_version=expected_version
+        )
+    except crud.VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     
     if updated_vendor is None:
         raise HTTPException(status_code=404, detail=f"Vendor with id {vendor_id} not found")
     
+    response.headers["ETag"] = etag_for(updated_vendor)
     return updated_vendor
 
 @app.delete("/vendors/{vendor_id}", status_code=204)
-def delete_vendor(vendor_id: int, db: Session = Depends(get_db)):
-    """Delete vendor"""
-    success = crud.delete_vendor(db=db, vendor_id=vendor_id)
+def delete_vendor(
+    vendor_id: int,
+    expected_version: Optional[int] = Depends(parse_if_match),
+    org_id: int = Depends(get_org_id),
+    db: Session = Depends(get_db)
+):
+    """Delete vendor (conditional on If-Match when given)"""
+    try:
+        success = crud.delete_vendor(db=db, org_id=org_id, vendor_id=vendor_id, expected_version=expected_version)
+    except crud.VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     
     if not success:
         raise HTTPException(status_code=404, detail=f"Vendor with id {vendor_id} not found")
     
     return None
 
+@app.post("/vendors/{vendor_id}/restore", response_model=VendorResponse)
+def restore_vendor(
+    vendor_id: int,
+    response: Response,
+    org_id: int = Depends(get_org_id),
+    db: Session = Depends(get_db)
+):
+    """Restore a soft-deleted vendor (until it has been purged to the archive)"""
+    restored_vendor = crud.restore_vendor(db=db, org_id=org_id, vendor_id=vendor_id)
+    
+    if restored_vendor is None:
+        raise HTTPException(status_code=404, detail=f"Deleted vendor with id {vendor_id} not found")
+    
+    response.headers["ETag"] = etag_for(restored_vendor)
+    return restored_vendor
+
 # endpoint statistics (summary of vendors for analytics)
 @app.get("/vendors/stats/summary")
-def get_vendor_statistics(db: Session = Depends(get_db)):
+def get_vendor_statistics(org_id: int = Depends(get_org_id), db: Session = Depends(get_read_db)):
     """Get summary statistics about vendors"""
-    from sqlalchemy import func
-    from models import Vendor, VendorStatus
-    
-    total_vendors = db.query(Vendor).count()
-    active_vendors = db.query(Vendor).filter(Vendor.status == VendorStatus.ACTIVE).count()
-    total_spend = db.query(func.sum(Vendor.total_spend)).scalar() or 0
-    
-    return {
-        "total_vendors": total_vendors,
-        "active_vendors": active_vendors,
-        "inactive_vendors": total_vendors - active_vendors,
-        "total_spend": round(total_spend, 2)
-    }
\ No newline at end of file
+    return crud.get_vendor_stats(db=db, org_id=org_id)
\ No newline at end of file
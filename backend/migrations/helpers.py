@@ -0,0 +1,123 @@
+"""
+Helpers for migrations that must not stall production traffic
+
+- create_index_online / drop_index_online: CREATE/DROP INDEX CONCURRENTLY on
+  PostgreSQL (per partition when the table is partitioned), plain DDL elsewhere
+- backfill_in_batches: walk a large table by primary key in small autocommitted
+  batches with a pause in between
+"""
+from typing import Callable, List, Optional, Sequence
+import time
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _partitions(table: str) -> List[str]:
+    """Names of the partitions of `table`, empty if it is not partitioned"""
+    return list(op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table ORDER BY c.relname"
+    ), {"table": table}).scalars())
+
+
+def create_index_online(name: str, table: str, columns: Sequence[str], where: Optional[str] = None):
+    """
+    Build an index without blocking writes to the table
+
+    CONCURRENTLY can't run inside a transaction or on a partitioned parent, so on
+    a partitioned table each partition's index is built concurrently and then
+    attached to an index created ON ONLY the parent.
+    """
+    if not _is_postgresql():
+        where_kw = {"sqlite_where": sa.text(where)} if where else {}
+        op.create_index(name, table, list(columns), if_not_exists=True, **where_kw)
+        return
+
+    column_sql = ", ".join(columns)
+    where_sql = f" WHERE {where}" if where else ""
+    with op.get_context().autocommit_block():
+        partitions = _partitions(table)
+        if not partitions:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column_sql}){where_sql}")
+            return
+
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} ({column_sql}){where_sql}")
+        for partition in partitions:
+            partition_index = f"{name}_{partition}"[:63]
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} "
+                f"ON {partition} ({column_sql}){where_sql}"
+            )
+            op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+
+
+def drop_index_online(name: str, table: str):
+    """Drop an index without blocking the table (the parent index cascades to partitions)"""
+    if not _is_postgresql():
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        if _partitions(table):
+            # DROP INDEX CONCURRENTLY is not supported on partitioned indexes
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+        else:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def backfill_in_batches(
+    table: str,
+    columns: Sequence[str],
+    apply: Callable[[sa.Connection, list], None],
+    where: Optional[str] = None,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.1,
+    key: str = "id"
+) -> int:
+    """
+    Feed rows of `table` to `apply` in primary key order, one batch at a time
+
+    Runs outside the migration transaction with autocommit, so every statement
+    commits on its own and a backfill over millions of rows never holds row locks
+    for long. The pause between batches keeps it from saturating the database.
+    Returns the number of rows visited.
+
+    Args:
+        columns: Columns selected for each row (the key is always included)
+        apply: Called with the connection and the batch rows, issues the updates
+        where: Optional SQL filter, e.g. "name_key IS NULL"
+    """
+    selected = ", ".join([key, *[c for c in columns if c != key]])
+
+    def batch_sql(after_key: bool) -> sa.TextClause:
+        filters = ([f"{key} > :last_key"] if after_key else []) + ([f"({where})"] if where else [])
+        where_sql = f"WHERE {' AND '.join(filters)} " if filters else ""
+        return sa.text(f"SELECT {selected} FROM {table} {where_sql}ORDER BY {key} LIMIT :batch_size")
+
+    visited = 0
+    last_key = None
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            params = {"batch_size": batch_size}
+            if last_key is not None:
+                params["last_key"] = last_key
+            rows = bind.execute(batch_sql(last_key is not None), params).all()
+            if not rows:
+                break
+            apply(bind, rows)
+
+            visited += len(rows)
+            last_key = getattr(rows[-1], key)
+            if len(rows) < batch_size:
+                break
+            time.sleep(pause_seconds)
+
+    return visited
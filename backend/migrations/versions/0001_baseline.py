@@ -0,0 +1,66 @@
+"""baseline vendors table, as created by the original init_db.py
+
+Databases created by init_db.py before migrations were added are at this
+revision: mark them with `alembic stamp 0001`, then `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 18:22:39.067639
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def payment_method_type(create_type: bool = True):
+    return sa.Enum('CARD', 'ACH', 'CHECK', 'WIRE', name='paymentmethod').with_variant(
+        postgresql.ENUM('CARD', 'ACH', 'CHECK', 'WIRE', name='paymentmethod', create_type=create_type), 'postgresql'
+    )
+
+
+def vendor_status_type(create_type: bool = True):
+    return sa.Enum('ACTIVE', 'INACTIVE', 'PENDING', name='vendorstatus').with_variant(
+        postgresql.ENUM('ACTIVE', 'INACTIVE', 'PENDING', name='vendorstatus', create_type=create_type), 'postgresql'
+    )
+
+
+def upgrade() -> None:
+    op.create_table('vendors',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=True),
+    sa.Column('owner', sa.String(), nullable=True),
+    sa.Column('total_spend', sa.Float(), nullable=True),
+    sa.Column('thirty_day_spend', sa.Float(), nullable=True),
+    sa.Column('ninety_day_spend', sa.Float(), nullable=True),
+    sa.Column('payment_method', payment_method_type(), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('department', sa.String(), nullable=True),
+    sa.Column('status', vendor_status_type(), nullable=True),
+    sa.Column('tax_details_submitted', sa.String(), nullable=True),
+    sa.Column('vendor_1099_2024', sa.String(), nullable=True),
+    sa.Column('vendor_1099_2025', sa.String(), nullable=True),
+    sa.Column('creation_date', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_vendors_id', 'vendors', ['id'], unique=False)
+    op.create_index('ix_vendors_name', 'vendors', ['name'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vendors_name', table_name='vendors')
+    op.drop_index('ix_vendors_id', table_name='vendors')
+    op.drop_table('vendors')
+    postgresql.ENUM(name='vendorstatus').drop(op.get_bind(), checkfirst=True)
+    postgresql.ENUM(name='paymentmethod').drop(op.get_bind(), checkfirst=True)
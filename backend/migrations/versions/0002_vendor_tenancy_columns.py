@@ -0,0 +1,42 @@
+"""add org_id, version, deleted_at and name_key to vendors
+
+Existing vendors are assigned to DEFAULT_ORG_ID. Every column is added with a
+constant default or as nullable, which PostgreSQL applies without rewriting the table.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 18:30:04.218391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database import DEFAULT_ORG_ID
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('vendors', sa.Column('org_id', sa.Integer(), server_default=str(DEFAULT_ORG_ID), nullable=False))
+    op.add_column('vendors', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('vendors', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('vendors', sa.Column('name_key', sa.String(), nullable=True))
+    if op.get_bind().dialect.name == 'postgresql':
+        # the default only backfills existing rows, new vendors always name their org
+        # (SQLite can't drop a column default without rebuilding the table, so it keeps it)
+        op.alter_column('vendors', 'org_id', server_default=None)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('vendors') as batch_op:
+        batch_op.drop_column('name_key')
+        batch_op.drop_column('deleted_at')
+        batch_op.drop_column('version')
+        batch_op.drop_column('org_id')
@@ -0,0 +1,83 @@
+"""create vendor_name_buckets, idempotency_keys and vendors_archive
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 18:33:47.560912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the enum types already exist since 0001
+payment_method_type = sa.Enum('CARD', 'ACH', 'CHECK', 'WIRE', name='paymentmethod').with_variant(
+    postgresql.ENUM('CARD', 'ACH', 'CHECK', 'WIRE', name='paymentmethod', create_type=False), 'postgresql'
+)
+vendor_status_type = sa.Enum('ACTIVE', 'INACTIVE', 'PENDING', name='vendorstatus').with_variant(
+    postgresql.ENUM('ACTIVE', 'INACTIVE', 'PENDING', name='vendorstatus', create_type=False), 'postgresql'
+)
+
+
+def upgrade() -> None:
+    op.create_table('vendor_name_buckets',
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('band', sa.SmallInteger(), nullable=False),
+    sa.Column('bucket', sa.BigInteger(), nullable=False),
+    sa.Column('vendor_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('org_id', 'band', 'bucket', 'vendor_id')
+    )
+    op.create_index('ix_vendor_name_buckets_org_id_vendor_id', 'vendor_name_buckets', ['org_id', 'vendor_id'], unique=False)
+    op.create_table('idempotency_keys',
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('request_hash', sa.String(), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=False),
+    sa.Column('response_body', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('org_id', 'key')
+    )
+    op.create_index(op.f('ix_idempotency_keys_created_at'), 'idempotency_keys', ['created_at'], unique=False)
+    op.create_table('vendors_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('name_key', sa.String(), nullable=True),
+    sa.Column('category', sa.String(), nullable=True),
+    sa.Column('owner', sa.String(), nullable=True),
+    sa.Column('total_spend', sa.Float(), nullable=True),
+    sa.Column('thirty_day_spend', sa.Float(), nullable=True),
+    sa.Column('ninety_day_spend', sa.Float(), nullable=True),
+    sa.Column('payment_method', payment_method_type, nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('department', sa.String(), nullable=True),
+    sa.Column('status', vendor_status_type, nullable=True),
+    sa.Column('tax_details_submitted', sa.String(), nullable=True),
+    sa.Column('vendor_1099_2024', sa.String(), nullable=True),
+    sa.Column('vendor_1099_2025', sa.String(), nullable=True),
+    sa.Column('creation_date', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_vendors_archive_org_id_id', 'vendors_archive', ['org_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vendors_archive_org_id_id', table_name='vendors_archive')
+    op.drop_table('vendors_archive')
+    op.drop_index(op.f('ix_idempotency_keys_created_at'), table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
+    op.drop_index('ix_vendor_name_buckets_org_id_vendor_id', table_name='vendor_name_buckets')
+    op.drop_table('vendor_name_buckets')
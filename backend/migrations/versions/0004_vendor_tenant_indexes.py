@@ -0,0 +1,44 @@
+"""replace the vendors indexes with tenant-prefixed, partial ones
+
+Every read is scoped to an org and skips tombstones, so the new indexes lead
+with org_id and (except ix_vendors_org_id_id) only cover live rows. Built
+online before the old single-column indexes are dropped.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 18:36:21.904457
+
+"""
+from typing import Sequence, Union
+
+from migrations.helpers import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE_INDEX_COLUMNS = ['name', 'creation_date', 'status', 'name_key']
+
+
+def upgrade() -> None:
+    create_index_online('ix_vendors_org_id_id', 'vendors', ['org_id', 'id'])
+    for column in LIVE_INDEX_COLUMNS:
+        create_index_online(f'ix_vendors_org_id_{column}', 'vendors', ['org_id', column], where='deleted_at IS NULL')
+    create_index_online('ix_vendors_tombstones', 'vendors', ['deleted_at'], where='deleted_at IS NOT NULL')
+
+    # the primary key already covers id, and name lookups are per org now
+    drop_index_online('ix_vendors_id', 'vendors')
+    drop_index_online('ix_vendors_name', 'vendors')
+
+
+def downgrade() -> None:
+    create_index_online('ix_vendors_id', 'vendors', ['id'])
+    create_index_online('ix_vendors_name', 'vendors', ['name'])
+
+    drop_index_online('ix_vendors_tombstones', 'vendors')
+    for column in LIVE_INDEX_COLUMNS:
+        drop_index_online(f'ix_vendors_org_id_{column}', 'vendors')
+    drop_index_online('ix_vendors_org_id_id', 'vendors')
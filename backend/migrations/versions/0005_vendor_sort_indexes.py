@@ -0,0 +1,32 @@
+"""index the sortable vendor list columns
+
+The vendor table sorts by spend and department, which without these indexes
+means sorting every live row of the org on each page. Built online.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 18:40:12.514220
+
+"""
+from typing import Sequence, Union
+
+from migrations.helpers import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SORT_COLUMNS = ['total_spend', 'thirty_day_spend', 'ninety_day_spend', 'department']
+
+
+def upgrade() -> None:
+    for column in SORT_COLUMNS:
+        create_index_online(f'ix_vendors_org_id_{column}', 'vendors', ['org_id', column], where='deleted_at IS NULL')
+
+
+def downgrade() -> None:
+    for column in SORT_COLUMNS:
+        drop_index_online(f'ix_vendors_org_id_{column}', 'vendors')
@@ -0,0 +1,56 @@
+"""backfill name keys and LSH buckets for duplicate detection
+
+Vendors created before duplicate detection have no name_key or buckets, so the
+pre-insert check and the duplicates report can't see them. Runs in throttled batches.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 18:41:55.102877
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migrations.helpers import backfill_in_batches
+import dedupe
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def index_names(conn, rows) -> None:
+    keys = [{'id': row.id, 'name_key': dedupe.normalize_name(row.name)} for row in rows]
+    conn.execute(
+        sa.text('DELETE FROM vendor_name_buckets WHERE org_id = :org_id AND vendor_id = :id'),
+        [{'org_id': row.org_id, 'id': row.id} for row in rows]
+    )
+    conn.execute(
+        sa.text(
+            'INSERT INTO vendor_name_buckets (org_id, band, bucket, vendor_id) '
+            'VALUES (:org_id, :band, :bucket, :vendor_id)'
+        ),
+        [
+            {'org_id': row.org_id, 'band': band, 'bucket': bucket, 'vendor_id': row.id}
+            for row, key in zip(rows, keys)
+            for band, bucket in dedupe.band_buckets(key['name_key'])
+        ]
+    )
+    # name_key last, so a batch interrupted halfway is picked up again on the next run
+    conn.execute(
+        sa.text('UPDATE vendors SET name_key = :name_key WHERE id = :id'),
+        keys
+    )
+
+
+def upgrade() -> None:
+    backfill_in_batches('vendors', ['org_id', 'name'], index_names, where='name_key IS NULL')
+
+
+def downgrade() -> None:
+    # the keys are derived data, leaving them in place is harmless
+    pass
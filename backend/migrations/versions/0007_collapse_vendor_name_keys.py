@@ -0,0 +1,57 @@
+"""rebuild name keys and LSH buckets without spaces
+
+normalize_name now drops the spaces between words, so "Work Grounds" and
+"Workgrounds" share a key. Only keys that still contain a space change, the
+rest are skipped. Runs in throttled batches.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 21:12:40.318562
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migrations.helpers import backfill_in_batches
+import dedupe
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def index_names(conn, rows) -> None:
+    keys = [{'id': row.id, 'name_key': dedupe.normalize_name(row.name)} for row in rows]
+    conn.execute(
+        sa.text('DELETE FROM vendor_name_buckets WHERE org_id = :org_id AND vendor_id = :id'),
+        [{'org_id': row.org_id, 'id': row.id} for row in rows]
+    )
+    conn.execute(
+        sa.text(
+            'INSERT INTO vendor_name_buckets (org_id, band, bucket, vendor_id) '
+            'VALUES (:org_id, :band, :bucket, :vendor_id)'
+        ),
+        [
+            {'org_id': row.org_id, 'band': band, 'bucket': bucket, 'vendor_id': row.id}
+            for row, key in zip(rows, keys)
+            for band, bucket in dedupe.band_buckets(key['name_key'])
+        ]
+    )
+    # name_key last, so a batch interrupted halfway is picked up again on the next run
+    conn.execute(
+        sa.text('UPDATE vendors SET name_key = :name_key WHERE id = :id'),
+        keys
+    )
+
+
+def upgrade() -> None:
+    backfill_in_batches('vendors', ['org_id', 'name'], index_names, where="name_key LIKE '% %'")
+
+
+def downgrade() -> None:
+    # the keys are derived data, `python dedupe.py` rebuilds them for the code that is deployed
+    pass
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Float, DateTime, Index, Table, JSON, text, Enum as SQLEnum
 from sqlalchemy.sql import func
 from database import Base
 import enum
@@ -17,8 +17,13 @@ class PaymentMethod(str, enum.Enum):
 class Vendor(Base):
     __tablename__ = "vendors"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+
+    # tenant key, every query is scoped by it
+    org_id = Column(Integer, nullable=False)
+
+    name = Column(String, nullable=False)
+    name_key = Column(String, nullable=True)  # normalized name for duplicate detection, see dedupe.py
     category = Column(String, nullable=True)
     owner = Column(String, nullable=True)
     
@@ -46,5 +51,75 @@ class Vendor(Base):
     creation_date = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # optimistic concurrency, bumped by every update and exposed as the ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # soft delete tombstone, purge.py archives old ones
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+    # all indexes lead with org_id so per-tenant queries stay inside the tenant's range,
+    # and the read indexes are partial so tombstones never bloat them
+    __table_args__ = (
+        Index("ix_vendors_org_id_id", "org_id", "id"),
+        Index("ix_vendors_org_id_name", "org_id", "name",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_vendors_org_id_creation_date", "org_id", "creation_date",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_vendors_org_id_status", "org_id", "status",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_vendors_org_id_name_key", "org_id", "name_key",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        # sortable list columns (migration 0005)
+        Index("ix_vendors_org_id_total_spend", "org_id", "total_spend",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_vendors_org_id_thirty_day_spend", "org_id", "thirty_day_spend",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_vendors_org_id_ninety_day_spend", "org_id", "ninety_day_spend",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_vendors_org_id_department", "org_id", "department",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        # the purge scans tombstones across all orgs, so this one is not tenant-prefixed
+        Index("ix_vendors_tombstones", "deleted_at",
+              postgresql_where=text("deleted_at IS NOT NULL"), sqlite_where=text("deleted_at IS NOT NULL")),
+    )
+
+    def __repr__(self):
+        return f"<Vendor(name={self.name}, status={self.status})>"
+
+# purged tombstones are moved here, same columns as vendors plus archived_at
+vendors_archive = Table(
+    "vendors_archive",
+    Base.metadata,
+    *[column._copy() for column in Vendor.__table__.columns],
+    Column("archived_at", DateTime(timezone=True), server_default=func.now()),
+)
+Index("ix_vendors_archive_org_id_id", vendors_archive.c.org_id, vendors_archive.c.id)
+
+
+class VendorNameBucket(Base):
+    """MinHash/LSH band bucket of a vendor's name_key, vendors sharing a bucket are duplicate candidates"""
+    __tablename__ = "vendor_name_buckets"
+
+    # primary key doubles as the tenant-prefixed blocking index
+    org_id = Column(Integer, primary_key=True)
+    band = Column(SmallInteger, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    vendor_id = Column(Integer, primary_key=True)
+
+    __table_args__ = (
+        Index("ix_vendor_name_buckets_org_id_vendor_id", "org_id", "vendor_id"),
+    )
+
+class IdempotencyKey(Base):
+    """Stored response for a POST carrying an Idempotency-Key, replayed on retries"""
+    __tablename__ = "idempotency_keys"
+
+    org_id = Column(Integer, primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)  # sha256 of the request body
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
     def __repr__(self):
-        return f"<Vendor(name={self.name}, status={self.status})>"
\ No newline at end of file
+        return f"<IdempotencyKey(org_id={self.org_id}, key={self.key})>"
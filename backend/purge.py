@@ -0,0 +1,41 @@
+from database import SessionLocal
+from crud import purge_deleted_vendors, purge_idempotency_keys
+from datetime import datetime, timedelta, timezone
+import argparse
+import time
+import os
+
+# soft-deleted vendors stay restorable for this long before they are archived
+PURGE_RETENTION_DAYS = float(os.getenv("PURGE_RETENTION_DAYS", "30"))
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+# retries with the same Idempotency-Key are recognised for this long
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+def purge_once(retention_days: float = PURGE_RETENTION_DAYS, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Archive every tombstone older than the retention window and drop expired idempotency keys"""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        purged = purge_deleted_vendors(db, older_than=cutoff, batch_size=batch_size)
+        print(f"Archived {purged} deleted vendors older than {cutoff.isoformat()}")
+
+        key_cutoff = datetime.now(timezone.utc) - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+        expired = purge_idempotency_keys(db, older_than=key_cutoff)
+        print(f"Removed {expired} expired idempotency keys")
+        return purged
+    except Exception as e:
+        db.rollback()
+        print(f"Error purging vendors: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive soft-deleted vendors in batches")
+    parser.add_argument("--loop", type=float, metavar="SECONDS", help="keep running, purging every SECONDS")
+    args = parser.parse_args()
+
+    purge_once()
+    while args.loop:
+        time.sleep(args.loop)
+        purge_once()
@@ -0,0 +1,217 @@
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from abc import ABC, abstractmethod
+import hashlib
+import math
+import time
+import os
+
+# per-client token bucket: RATE_LIMIT_PER_SECOND sustained, bursts up to RATE_LIMIT_BURST (0 = no limit)
+# off by default: clients are told apart by IP, which behind a proxy is the proxy's own
+# unless uvicorn trusts its X-Forwarded-For (--proxy-headers --forwarded-allow-ips)
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "0"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "40"))
+# "memory" keeps buckets per process, "redis" shares them between workers and pods
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+
+# requests one route may run at once, kept under the sync threadpool size (40) so a
+# single hot route can't take every thread (0 = no cap)
+ROUTE_CONCURRENCY_LIMIT = int(os.getenv("ROUTE_CONCURRENCY_LIMIT", "24"))
+# shed new requests with 503 past this many in flight, or once connection pool
+# checkouts wait longer than SHED_POOL_WAIT_MS on average (0 = never)
+SHED_MAX_IN_FLIGHT = int(os.getenv("SHED_MAX_IN_FLIGHT", "100"))
+SHED_POOL_WAIT_MS = float(os.getenv("SHED_POOL_WAIT_MS", "500"))
+SHED_RETRY_AFTER_SECONDS = int(os.getenv("SHED_RETRY_AFTER_SECONDS", "1"))
+
+# never limited, so orchestrator probes keep answering under load
+EXEMPT_PATHS = ("/", "/health")
+
+# redis is optional, only needed for the shared backend
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+class RateLimitBackend(ABC):
+    """Storage for the token buckets, subclass it to keep them somewhere shared"""
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Take a token from key's bucket, returns 0 if allowed or the seconds until one is available"""
+
+class MemoryBackend(RateLimitBackend):
+    """Buckets in a dict, limits apply per worker process"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        # runs on the event loop thread, no lock needed
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+
+        if len(self._buckets) > self.max_keys:
+            # a bucket that has refilled is the same as no bucket
+            for bucket_key, (bucket_tokens, bucket_updated) in list(self._buckets.items()):
+                if bucket_tokens + (now - bucket_updated) * rate >= burst:
+                    del self._buckets[bucket_key]
+        return wait
+
+# refill and take in one round trip, timed by the Redis clock so pods with skewed clocks agree
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+class RedisBackend(RateLimitBackend):
+    """Buckets in Redis, one limit per client across every worker and pod"""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "ratelimit:"):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package (pip install redis)")
+        self.prefix = prefix
+        self.client = redis.from_url(url)
+        self._script = self.client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        try:
+            return float(await self._script(keys=[self.prefix + key], args=[rate, burst]))
+        except redis.RedisError:
+            # a limiter outage must not take the API down with it
+            return 0.0
+
+def backend_from_env() -> RateLimitBackend:
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend()
+    if RATE_LIMIT_BACKEND == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {RATE_LIMIT_BACKEND}")
+
+def client_keys(scope: Scope) -> List[str]:
+    """
+    Buckets a request is charged to: always the client IP, plus the X-API-Key if sent
+
+    The client IP is the connection's peer. Behind a proxy, uvicorn only replaces it
+    with the X-Forwarded-For address when the proxy is in --forwarded-allow-ips.
+
+    API keys aren't validated, so a key alone can't identify a client: inventing a
+    new key per request would get a fresh bucket every time. The IP bucket still
+    applies, and the key bucket keeps one key from using a whole IP's allowance.
+    Keys are hashed so they never land in the backend.
+    """
+    client = scope.get("client")
+    keys = ["ip:" + (client[0] if client else "anonymous")]
+    api_key = Headers(scope=scope).get("x-api-key")
+    if api_key:
+        keys.append("key:" + hashlib.sha256(api_key.encode()).hexdigest())
+    return keys
+
+class RateLimitMiddleware:
+    """
+    Per-client rate limiting, per-route concurrency caps and load shedding
+
+    A client past its token bucket gets 429. A route at its concurrency cap, or a
+    server with too many requests in flight or a slow connection pool, answers 503.
+    Both carry Retry-After. EXEMPT_PATHS skip every check.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend: Optional[RateLimitBackend] = None,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: int = RATE_LIMIT_BURST,
+        route_limit: int = ROUTE_CONCURRENCY_LIMIT,
+        max_in_flight: int = SHED_MAX_IN_FLIGHT,
+        max_pool_wait_ms: float = SHED_POOL_WAIT_MS,
+        pool_wait: Optional[Callable[[], float]] = None,
+        exempt_paths: Iterable[str] = EXEMPT_PATHS
+    ):
+        self.app = app
+        self.backend = backend or MemoryBackend()
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.route_limit = route_limit
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait = max_pool_wait_ms / 1000
+        self.pool_wait = pool_wait
+        self.exempt_paths = set(exempt_paths)
+        self.in_flight = 0
+        self.route_in_flight: Dict[str, int] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        if self.rate > 0:
+            wait = 0.0
+            for key in client_keys(scope):
+                wait = max(wait, await self.backend.take(key, self.rate, self.burst))
+            if wait > 0:
+                await self._reject(scope, receive, send, 429, "Rate limit exceeded", wait)
+                return
+
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            await self._reject(scope, receive, send, 503, "Server is overloaded, retry shortly")
+            return
+        if self.pool_wait is not None and self.max_pool_wait and self.pool_wait() > self.max_pool_wait:
+            await self._reject(scope, receive, send, 503, "Database is overloaded, retry shortly")
+            return
+
+        route = self._route_key(scope) if self.route_limit else None
+        if route is not None and self.route_in_flight.get(route, 0) >= self.route_limit:
+            await self._reject(scope, receive, send, 503, "Too many concurrent requests for this endpoint")
+            return
+
+        self.in_flight += 1
+        if route is not None:
+            self.route_in_flight[route] = self.route_in_flight.get(route, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            if route is not None:
+                self.route_in_flight[route] -= 1
+                if not self.route_in_flight[route]:
+                    del self.route_in_flight[route]
+
+    def _route_key(self, scope: Scope) -> Optional[str]:
+        """Method and path template, e.g. "GET /vendors/{vendor_id}", None when nothing matches"""
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return f"{scope['method']} {route.path}"
+        return None
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, status_code: int, detail: str, wait: float = 0):
+        retry_after = max(1, math.ceil(wait) if wait else SHED_RETRY_AFTER_SECONDS)
+        response = JSONResponse({"detail": detail}, status_code=status_code, headers={"Retry-After": str(retry_after)})
+        await response(scope, receive, send)
@@ -37,7 +37,9 @@ class VendorUpdate(BaseModel):
 
 class VendorResponse(VendorBase):
     id: int
+    org_id: int
     creation_date: datetime
     updated_at: Optional[datetime] = None
+    version: int
 
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
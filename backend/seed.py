@@ -1,11 +1,13 @@
-from database import SessionLocal
-from models import Vendor, VendorStatus, PaymentMethod
+from database import SessionLocal, DEFAULT_ORG_ID
+from models import Vendor, VendorStatus, PaymentMethod, VendorNameBucket
+from dedupe import rebuild_name_index
 import random
 
 def clear_data():
     """Clear existing vendor data"""
     db = SessionLocal()
     try:
+        db.query(VendorNameBucket).delete()
         db.query(Vendor).delete()
         db.commit()
         print("Cleared existing vendor data")
@@ -472,11 +474,14 @@ def seed_vendors():
     
     try:
         for vendor_data in vendors_data:
-            vendor = Vendor(**vendor_data)
+            vendor = Vendor(org_id=DEFAULT_ORG_ID, **vendor_data)
             db.add(vendor)
         
         db.commit()
         print(f"Successfully seeded {len(vendors_data)} vendors!")
+
+        # normalized names and LSH buckets for duplicate detection
+        rebuild_name_index(db)
         
         # verify
         count = db.query(Vendor).count()
@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+# every module reads its settings at import, so point them at a scratch SQLite
+# database (and turn off the per-client limits) before anything imports them
+_db_dir = tempfile.mkdtemp(prefix="vendor-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["RATE_LIMIT_PER_SECOND"] = "0"
+os.environ["ROUTE_CONCURRENCY_LIMIT"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database import Base, SessionLocal, engine
+import main
+import models  # noqa: F401  registers the tables
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
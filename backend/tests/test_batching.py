@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batching import VendorCreateBatcher, _PendingCreate
+from schemas import VendorCreate, VendorResponse
+import main
+
+
+@pytest.fixture
+def batcher(monkeypatch):
+    batcher = VendorCreateBatcher(window_ms=20)
+    batcher.start()
+    monkeypatch.setattr(main, "vendor_batcher", batcher)
+    yield batcher
+    batcher.stop()
+
+
+def test_failed_row_does_not_expire_vendors_already_handed_out():
+    # the repeated key fails the bulk insert, and then fails again as the last row of
+    # the row-by-row replay, after the first two callers already have their vendors
+    batch = [
+        _PendingCreate(1, VendorCreate(name="First Vendor"), "key-a", "hash-a"),
+        _PendingCreate(1, VendorCreate(name="Second Vendor"), "key-b", "hash-b"),
+        _PendingCreate(1, VendorCreate(name="First Vendor"), "key-a", "hash-a", allow_duplicates=True),
+    ]
+    VendorCreateBatcher()._flush(batch)
+
+    first, second = batch[0].future.result(), batch[1].future.result()
+    assert VendorResponse.model_validate(first).name == "First Vendor"
+    assert VendorResponse.model_validate(second).name == "Second Vendor"
+    assert batch[2].future.exception() is not None
+
+
+def test_retries_in_the_same_batch_share_one_vendor(client, batcher):
+    # each key is sent twice at once, so retries race their originals inside a batch
+    # and the bulk insert falls back to row by row
+    for round_ in range(3):
+        jobs = [(f"Retry Vendor {round_}-{i}", f"key-{round_}-{i}") for i in range(15)] * 2
+        with ThreadPoolExecutor(len(jobs)) as pool:
+            responses = list(pool.map(
+                lambda job: client.post(
+                    "/vendors?allow_duplicates=true",
+                    json={"name": job[0]},
+                    headers={"Idempotency-Key": job[1]}
+                ),
+                jobs
+            ))
+
+        assert [r.status_code for r in responses] == [201] * len(jobs)
+        ids_by_key = {}
+        for (name, key), response in zip(jobs, responses):
+            assert response.json()["name"] == name
+            ids_by_key.setdefault(key, set()).add(response.json()["id"])
+        assert all(len(ids) == 1 for ids in ids_by_key.values())
+        assert len({ids.pop() for ids in ids_by_key.values()}) == 15
+
+
+def test_duplicates_in_the_same_batch_are_rejected(client, batcher):
+    with ThreadPoolExecutor(6) as pool:
+        responses = list(pool.map(lambda _: client.post("/vendors", json={"name": "Samename Corp"}), range(6)))
+
+    assert sorted(r.status_code for r in responses) == [201] + [409] * 5
+    created = next(r for r in responses if r.status_code == 201).json()
+    for response in responses:
+        if response.status_code == 409:
+            assert response.json()["detail"]["matches"] == [{"id": created["id"], "name": "Samename Corp"}]
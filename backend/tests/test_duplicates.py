@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from schemas import VendorCreate
+import crud
+import dedupe
+
+
+def _seed_vendors(db, count=120):
+    """Families of spelling variants (some chained, A~B~C but not A~C) plus loners"""
+    rng = random.Random(7)
+    words = ["acme", "globex", "initech", "umbrella", "hooli", "vandelay", "stark", "wayne",
+             "tyrell", "cyberdyne", "soylent", "wonka", "oscorp", "gringotts", "nakatomi", "duff"]
+    names = []
+    while len(names) < count:
+        base = f"{rng.choice(words)} {rng.choice(words)} {rng.randrange(1000)}"
+        variants = [base, base.title() + " Inc", base.upper() + ", LLC", base + "s", base + "s co"]
+        names += variants[:rng.randrange(1, len(variants) + 1)]
+    rng.shuffle(names)
+    for name in names[:count]:
+        crud.create_vendor(db, org_id=1, vendor=VendorCreate(name=name), allow_duplicates=True)
+
+
+def _all_pages(db, limit, max_pairs):
+    groups, after_id = [], 0
+    while True:
+        page, next_after_id = crud.get_duplicate_groups(db, 1, limit=limit, after_id=after_id, max_pairs=max_pairs)
+        groups += [tuple(v.id for v in group) for group in page]
+        if next_after_id is None:
+            return groups
+        assert next_after_id >= after_id
+        after_id = next_after_id
+
+
+@pytest.mark.parametrize("limit,max_pairs", [(500, 5), (500, 50), (3, 100000), (4, 7)])
+def test_paging_matches_a_single_page(db, limit, max_pairs):
+    _seed_vendors(db)
+    everything, next_after_id = crud.get_duplicate_groups(db, 1, limit=10000, max_pairs=100000)
+    assert next_after_id is None
+    assert len(everything) > 10
+
+    assert _all_pages(db, limit, max_pairs) == [tuple(v.id for v in group) for group in everything]
+
+
+def test_groups_are_verified_and_disjoint(db):
+    _seed_vendors(db)
+    groups, _ = crud.get_duplicate_groups(db, 1, limit=10000)
+    seen = set()
+    for group in groups:
+        ids = {v.id for v in group}
+        assert not ids & seen
+        seen |= ids
+        for vendor in group:
+            assert any(
+                dedupe.similarity(vendor.name_key, other.name_key) >= dedupe.DEDUPE_THRESHOLD
+                for other in group if other is not vendor
+            )
+
+
+def test_bulk_lookup_matches_one_lookup_per_name(db):
+    _seed_vendors(db)
+    crud.create_vendor(db, org_id=2, vendor=VendorCreate(name="Acme Acme 1"))
+    names = [v.name for v in crud.get_vendors(db, 1, limit=40)] + ["acme acme 1", "nothing like it"]
+    items = [(1, name) for name in names] + [(2, "ACME ACME 1, LLC"), (3, "acme acme 1")]
+
+    bulk = crud.find_similar_vendors_bulk(db, items)
+
+    assert [[v.id for v in matches] for matches in bulk] == [
+        [v.id for v in crud.find_similar_vendors(db, org_id, name)] for org_id, name in items
+    ]
+    assert bulk[-2] and not bulk[-1]
+
+
+def test_word_breaks_do_not_hide_duplicates(db):
+    assert dedupe.normalize_name("Work Grounds Inc") == dedupe.normalize_name("Workgrounds INC")
+    existing = crud.create_vendor(db, org_id=1, vendor=VendorCreate(name="Workgrounds INC"))
+
+    assert [v.id for v in crud.find_similar_vendors(db, 1, "Work Grounds Inc")] == [existing.id]
+    assert [v.id for v in crud.find_similar_vendors(db, 1, "Work-Grounds Supply")] == [existing.id]
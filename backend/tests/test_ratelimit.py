@@ -0,0 +1,32 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from ratelimit import MemoryBackend, RateLimitMiddleware
+
+
+def _app(trusted_hosts):
+    app = FastAPI()
+
+    @app.get("/vendors")
+    def vendors():
+        return []
+
+    app.add_middleware(RateLimitMiddleware, backend=MemoryBackend(), rate=0.001, burst=1)
+    # what `uvicorn --proxy-headers --forwarded-allow-ips=...` wraps the app in
+    return TestClient(ProxyHeadersMiddleware(app, trusted_hosts=trusted_hosts))
+
+
+def test_clients_behind_a_trusted_proxy_get_their_own_bucket():
+    client = _app(trusted_hosts="testclient")
+
+    assert client.get("/vendors", headers={"X-Forwarded-For": "203.0.113.1"}).status_code == 200
+    assert client.get("/vendors", headers={"X-Forwarded-For": "203.0.113.2"}).status_code == 200
+    assert client.get("/vendors", headers={"X-Forwarded-For": "203.0.113.1"}).status_code == 429
+
+
+def test_forwarded_for_is_ignored_from_untrusted_peers():
+    client = _app(trusted_hosts="10.0.0.5")
+
+    assert client.get("/vendors", headers={"X-Forwarded-For": "203.0.113.1"}).status_code == 200
+    assert client.get("/vendors", headers={"X-Forwarded-For": "203.0.113.2"}).status_code == 429
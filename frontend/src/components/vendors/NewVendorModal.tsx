@@ -74,7 +74,11 @@ export default function NewVendorModal({
       onOpenChange(false);
       onVendorCreated();
     } catch (err) {
-      setError("Failed to create vendor. Please try again.");
+      setError(
+        err instanceof Error && err.message !== "Failed to create vendor"
+          ? err.message
+          : "Failed to create vendor. Please try again."
+      );
       console.error("Error creating vendor:", err);
     } finally {
       setLoading(false);
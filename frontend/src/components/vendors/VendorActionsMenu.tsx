@@ -16,6 +16,7 @@ interface VendorActionsMenuProps {
   currentStatus?: string;
   currentOwner?: string;
   currentDepartment?: string;
+  currentVersion?: number;
   onUpdate?: () => void;
   showMenu?: boolean;
 }
@@ -26,6 +27,7 @@ export function VendorActionsMenu({
   currentStatus = "active",
   currentOwner = "",
   currentDepartment = "",
+  currentVersion,
   onUpdate,
   showMenu = true,
 }: VendorActionsMenuProps) {
@@ -49,7 +51,7 @@ export function VendorActionsMenu({
       const updateData: Record<string, string> = {};
       updateData[editType] = value;
 
-      await vendorApi.updateVendor(vendorId, updateData);
+      await vendorApi.updateVendor(vendorId, updateData, currentVersion);
       onUpdate?.();
     } catch (error) {
       console.error("Error updating vendor:", error);
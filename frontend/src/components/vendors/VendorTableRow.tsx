@@ -228,6 +228,7 @@ export function VendorTableRow({
           currentStatus={vendor.status}
           currentOwner={vendor.owner || ""}
           currentDepartment={vendor.department || ""}
+          currentVersion={vendor.version}
           onUpdate={() => window.location.reload()}
         />
       </TableCell>
@@ -6,6 +6,9 @@ import type {
 
 const API_BASE_URL = "http://localhost:8000";
 
+// send cookies so reads right after a write are served by the primary database
+const withCredentials: RequestInit = { credentials: "include" };
+
 export const vendorApi = {
   // Get all vendors with optional search and sort
   async getVendors(params?: {
@@ -25,14 +28,14 @@ export const vendorApi = {
     if (params?.limit !== undefined)
       queryParams.append("limit", params.limit.toString());
 
-    const response = await fetch(`${API_BASE_URL}/vendors?${queryParams}`);
+    const response = await fetch(`${API_BASE_URL}/vendors?${queryParams}`, withCredentials);
     if (!response.ok) throw new Error("Failed to fetch vendors");
     return response.json();
   },
 
   // Get single vendor
   async getVendor(id: number): Promise<Vendor> {
-    const response = await fetch(`${API_BASE_URL}/vendors/${id}`);
+    const response = await fetch(`${API_BASE_URL}/vendors/${id}`, withCredentials);
     if (!response.ok) throw new Error("Failed to fetch vendor");
     return response.json();
   },
@@ -40,28 +43,40 @@ export const vendorApi = {
   // Create vendor
   async createVendor(vendor: CreateVendorRequest): Promise<Vendor> {
     const response = await fetch(`${API_BASE_URL}/vendors`, {
+      ...withCredentials,
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
       body: JSON.stringify(vendor),
     });
+    if (response.status === 409) {
+      const { detail } = await response.json();
+      throw new Error(detail.message);
+    }
     if (!response.ok) throw new Error("Failed to create vendor");
     return response.json();
   },
 
-  // Update vendor
+  // Update vendor (pass the version it was loaded at to reject concurrent edits)
   async updateVendor(
     id: number,
-    updates: Partial<CreateVendorRequest>
+    updates: Partial<CreateVendorRequest>,
+    version?: number
   ): Promise<Vendor> {
+    const headers: Record<string, string> = {
+      "Content-Type": "application/json",
+    };
+    if (version !== undefined) headers["If-Match"] = `"${version}"`;
+
     const response = await fetch(`${API_BASE_URL}/vendors/${id}`, {
+      ...withCredentials,
       method: "PUT",
-      headers: {
-        "Content-Type": "application/json",
-      },
+      headers,
       body: JSON.stringify(updates),
     });
+    if (response.status === 412)
+      throw new Error("Vendor was changed by someone else, reload and try again");
     if (!response.ok) throw new Error("Failed to update vendor");
     return response.json();
   },
@@ -69,6 +84,7 @@ export const vendorApi = {
   // Delete vendor
   async deleteVendor(id: number): Promise<void> {
     const response = await fetch(`${API_BASE_URL}/vendors/${id}`, {
+      ...withCredentials,
       method: "DELETE",
     });
     if (!response.ok) throw new Error("Failed to delete vendor");
@@ -76,7 +92,7 @@ export const vendorApi = {
 
   // Get statistics
   async getStatistics() {
-    const response = await fetch(`${API_BASE_URL}/api/stats/summary`);
+    const response = await fetch(`${API_BASE_URL}/api/stats/summary`, withCredentials);
     if (!response.ok) throw new Error("Failed to fetch statistics");
     return response.json();
   },
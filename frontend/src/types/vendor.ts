@@ -29,6 +29,7 @@ export interface Vendor {
   vendor_1099_2025: string | null;
   creation_date: string;
   updated_at: string | null;
+  version: number;
 }
 
 export interface VendorsResponse {